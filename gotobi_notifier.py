@@ -12,29 +12,35 @@ Gotobi Fixing Notifier (Python)
 from __future__ import annotations
 
 import argparse
-import dataclasses
 import datetime as dt
-import json
+import functools
 import os
-import shutil
-import subprocess
+import re
 import sys
 import time
-import urllib.error
-import urllib.request
 from pathlib import Path
+from typing import NamedTuple
 
 
 JST = dt.timezone(dt.timedelta(hours=9), name="JST")
 SCRIPT_DIR = Path(__file__).resolve().parent
 
+# 祝日CSVパース用（load_holiday_keys）
+# - コメント: # / // 以降を行末まで除去
+# - 区切り: '\t' / ';' は ',' に寄せ、日付内の '-' / '/' / '.' は除去
+# - 改行: バイト列のまま読むため '\r' も改行として扱う（'\r\n' は空行が増えるだけ）
+# - 日付: ',' 区切りのトークン全体が8桁数字（前後の空白は可）のものだけ
+_HOLIDAY_COMMENT_RE = re.compile(r"(?:#|//)[^\r\n]*")
+_HOLIDAY_TRANS = str.maketrans({"-": "", "/": "", ".": "", "\t": ",", ";": ",", "\r": "\n"})
+_HOLIDAY_DATE_RE = re.compile(r"(?:^|,)[^\S\n]*(\d{8})[^\S\n]*(?=,|$)", re.MULTILINE)
+
 
 def resolve_path(p: Path) -> Path:
     return p if p.is_absolute() else (SCRIPT_DIR / p)
 
 
-@dataclasses.dataclass(frozen=True)
-class Config:
+class Config(NamedTuple):
+    # 不変の設定値（NamedTuple: 属性アクセスが軽く、生成も速い）
     # gotobi rules
     include_day31: bool = True ## 31日を候補にするかどうか
     include_feb_last_day: bool = True ## 2月最終日を候補にするかどうか
@@ -60,6 +66,7 @@ class Config:
 
     # state
     state_file: Path = Path("gotobi-fixing.state.json") ## 最終通知したF(YYYYMMDD)をJSON形式で保存
+    pretty_state: bool = False ## stateをインデント付きで書き出すかどうか（既定は1行の compact JSON）
 
     # notify mode
     notify_mode: str = "ntfy"  # "ntfy"(default) / "local"
@@ -80,119 +87,208 @@ def _is_leap_year(year: int) -> bool:
     return year % 400 == 0 or (year % 4 == 0 and year % 100 != 0)
 
 
+# 月の日数（平年）。index=月、[0] は未使用
+_DIM = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
 def _days_in_month(year: int, month: int) -> int:
-    if month == 2:
-        return 29 if _is_leap_year(year) else 28
-    if month in (1, 3, 5, 7, 8, 10, 12):
-        return 31
-    return 30
+    if month == 2 and _is_leap_year(year):
+        return 29
+    return _DIM[month]
+
+
+# 年末年始(12/31, 1/1-1/3)の月日ビットマップ（ビット位置は _compress_holidays と同じ (月-1)*32 + (日-1)）
+_YE_MASK = (1 << (11 * 32 + 30)) | (1 << 0) | (1 << 1) | (1 << 2)
 
 
 def _is_yearend_closure_day(d: dt.date) -> bool:
-    return (d.month == 12 and d.day == 31) or (d.month == 1 and 1 <= d.day <= 3)
-
-
-def _try_parse_holiday_token(token: str) -> dt.date | None:
-    s = token.strip().replace("\r", "").strip()
-    if not s:
-        return None
-
-    # Normalize separators, then validate 8 digits
-    for ch in ("-", "/", "."):
-        s = s.replace(ch, "")
-    s = s.strip()
-    if len(s) != 8 or not s.isdigit():
-        return None
-
-    year = int(s[0:4])
-    month = int(s[4:6])
-    day = int(s[6:8])
-    if year <= 1900 or month < 1 or month > 12:
-        return None
-    dim = _days_in_month(year, month)
-    if day < 1 or day > dim:
-        return None
-    return dt.date(year, month, day)
+    return bool((_YE_MASK >> ((d.month - 1) * 32 + d.day - 1)) & 1)
 
 
-def load_holiday_keys(csv_path: Path) -> set[int]:
+def load_holiday_keys(csv_path: Path, *, st: os.stat_result | None = None) -> set[int]:
     """
     読み取り:
     - 空行スキップ
     - 行頭 # / // コメントスキップ、行中の # / // 以降も除去
     - 区切り: ',' / '\\t' / ';'（全て ',' に寄せる）
     - 行内の全トークンを日付として解釈できるものだけ採用
+    st: 呼び出し側で取得済みの stat 結果（あれば存在確認の stat を省略）
     """
-    if not csv_path.exists():
-        raise FileNotFoundError(f"Holiday CSV not found: {csv_path}")
+    if st is None:
+        try:
+            st = csv_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Holiday CSV not found: {csv_path}") from None
+
+    # 1回の read + decode で全体を読み、行単位ではなく全文に対して正規表現を適用する
+    text = csv_path.read_bytes().decode("utf-8")
+
+    # コメント除去は区切り正規化より先（'//' が '/' 除去で消えないように）
+    text = _HOLIDAY_COMMENT_RE.sub("", text).translate(_HOLIDAY_TRANS)
 
     keys: set[int] = set()
-    with csv_path.open("r", encoding="utf-8") as f:
-        for raw_line in f:
-            line = raw_line.replace("\r", "").strip()
-            if not line:
-                continue
-
-            # line comments
-            if line.startswith("#") or line.startswith("//"):
-                continue
-
-            # strip inline comments
-            hash_pos = line.find("#")
-            if hash_pos >= 0:
-                line = line[:hash_pos].strip()
-            slash_pos = line.find("//")
-            if slash_pos >= 0:
-                line = line[:slash_pos].strip()
-            if not line:
-                continue
-
-            line = line.replace("\t", ",").replace(";", ",")
-            tokens = [t.strip() for t in line.split(",") if t.strip()]
-            if not tokens:
-                continue
-
-            for t in tokens:
-                d = _try_parse_holiday_token(t)
-                if d is not None:
-                    keys.add(_date_key(d))
+    add = keys.add
+    for m in _HOLIDAY_DATE_RE.finditer(text):
+        # トークンは8桁そのものが YYYYMMDD キー。int() 1回で読み、年月日は整数演算で取り出して検証
+        key = int(m[1])
+        year, md = divmod(key, 10000)
+        month, day = divmod(md, 100)
+        if year > 1900 and 1 <= month <= 12 and 1 <= day <= _days_in_month(year, month):
+            add(key)
 
     if not keys:
         raise ValueError(f"No valid holiday dates found in: {csv_path}")
     return keys
 
 
-def _is_holiday(d: dt.date, holiday_keys: set[int]) -> bool:
-    return _date_key(d) in holiday_keys
+def _compress_holidays(keys: set[int]) -> dict[int, int]:
+    """
+    YYYYMMDD の集合を「年 -> 月日ビットマップ」に変換する。
+    ビット位置: (月-1)*32 + (日-1)（12ヶ月 x 32bit = 384bit の int）
+    """
+    out: dict[int, int] = {}
+    for key in keys:
+        year, md = divmod(key, 10000)
+        month, day = divmod(md, 100)
+        out[year] = out.get(year, 0) | (1 << ((month - 1) * 32 + day - 1))
+    return out
+
+
+def _merge_holiday_bitmaps(*bitmaps: dict[int, int]) -> dict[int, int]:
+    """
+    複数の年別ビットマップ（JP/US など）を OR で1つにまとめる。
+    """
+    out: dict[int, int] = {}
+    for bm in bitmaps:
+        for year, bits in bm.items():
+            out[year] = out.get(year, 0) | bits
+    return out
+
+
+# キャッシュ内容の形式を変えたら上げる（古いキャッシュを無効化するため）
+_HOLIDAY_CACHE_VERSION = 2
+
+
+def _holiday_cache_path(csv_path: Path) -> Path:
+    return csv_path.with_suffix(".cache.json")
+
+
+def load_holiday_keys_cached(csv_path: Path) -> dict[int, int]:
+    """
+    load_holiday_keys のキャッシュ版。戻り値は _compress_holidays の年別ビットマップ。
+    - CSVと同じ場所に <name>.cache.json を置き、(size, mtime_ns) が一致すれば再パースせず読み込む
+    - 不一致/破損時はCSVを読み直してキャッシュを作り直す
+    - 形式は JSON（pickle と違い、第三者が置いたファイルを読んでもコード実行にならない）
+    - キャッシュの書き込みに失敗しても（読み取り専用ディレクトリ等）判定には影響させない
+    """
+    import json
+
+    try:
+        st = csv_path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Holiday CSV not found: {csv_path}") from None
+    sig = [_HOLIDAY_CACHE_VERSION, st.st_size, st.st_mtime_ns]
+
+    cache_path = _holiday_cache_path(csv_path)
+    try:
+        obj = json.loads(cache_path.read_bytes())
+        if isinstance(obj, dict) and obj.get("sig") == sig and isinstance(obj.get("bitmap"), dict):
+            # JSON のキーは文字列なので年を int に戻す
+            cached = {int(year): bits for year, bits in obj["bitmap"].items()}
+            if all(type(bits) is int for bits in cached.values()):
+                return cached
+    except Exception:
+        pass
+
+    bitmap = _compress_holidays(load_holiday_keys(csv_path, st=st))
+    try:
+        tmp = cache_path.with_suffix(cache_path.suffix + ".tmp")
+        tmp.write_bytes(json.dumps({"sig": sig, "bitmap": bitmap}, separators=(",", ":")).encode("utf-8"))
+        tmp.replace(cache_path)
+    except OSError:
+        pass
+    return bitmap
 
 
 def normalize_biz_day(
     d: dt.date,
     *,
-    holiday_keys_jp: set[int] | None,
-    holiday_keys_us: set[int] | None,
+    holiday_keys: dict[int, int],
     cfg: Config,
 ) -> dt.date:
     """
     土日・祝日・年末年始なら前営業日に前倒し（最大60日遡り）
+    holiday_keys は有効な祝日CSV（JP/US）を _merge_holiday_bitmaps でまとめた年別ビットマップ
     """
-    cur = d
+    ye = _YE_MASK if cfg.exclude_yearend_bank_closure else 0
+    # 日付は通日(ordinal)で遡り、date への復元は平日のみ（0001-01-01=月曜 なので (o-1)%7 が weekday）
+    o = d.toordinal()
     for _ in range(60):
-        is_weekend = cur.weekday() >= 5  # 5=Sat,6=Sun
-        is_holiday = False
-        if cfg.enable_holiday_jp and holiday_keys_jp is not None:
-            is_holiday = is_holiday or _is_holiday(cur, holiday_keys_jp)
-        if cfg.enable_holiday_us and holiday_keys_us is not None:
-            is_holiday = is_holiday or _is_holiday(cur, holiday_keys_us)
-        is_yearend = cfg.exclude_yearend_bank_closure and _is_yearend_closure_day(cur)
-
-        if (not is_weekend) and (not is_holiday) and (not is_yearend):
-            return cur
-        cur = cur - dt.timedelta(days=1)
-    return cur
-
+        if (o - 1) % 7 < 5:  # 5=Sat,6=Sun
+            cur = dt.date.fromordinal(o)
+            # 祝日/年末年始の判定は、年別ビットマップと _YE_MASK を OR して1回のビット検査で行う
+            closed = holiday_keys.get(cur.year, 0) | ye
+            if not (closed >> ((cur.month - 1) * 32 + cur.day - 1)) & 1:
+                return cur
+        o -= 1
+    return dt.date.fromordinal(o)
+
+
+def build_biz_day_map(
+    start: dt.date,
+    end: dt.date,
+    *,
+    holiday_keys: dict[int, int],
+    cfg: Config,
+) -> dict[int, int]:
+    """
+    start～end の各日について normalize_biz_day の結果を前計算する。
+    戻り値: {YYYYMMDD: 前倒し後の営業日 YYYYMMDD}
+    start 以前の営業日は normalize_biz_day で求め、以降は1日ずつ進めながら直近の営業日を引き継ぐ。
+    """
+    ye = _YE_MASK if cfg.exclude_yearend_bank_closure else 0
 
-def build_gotobi_base_days(year: int, month: int, cfg: Config) -> list[int]:
+    biz_map: dict[int, int] = {}
+    last_biz_key = _date_key(
+        normalize_biz_day(start, holiday_keys=holiday_keys, cfg=cfg)
+    )
+    # date を作らず 年/月/日/曜日 を整数で進める
+    year, month, day = start.year, start.month, start.day
+    dim = _days_in_month(year, month)
+    weekday = start.weekday()
+    closed_year = -1
+    closed = 0
+    for _ in range(end.toordinal() - start.toordinal() + 1):
+        key = year * 10000 + month * 100 + day
+        if weekday < 5:
+            if closed_year != year:
+                # 非営業日ビットマップ（祝日 | 年末年始）は年が変わった時だけ引き直す
+                closed_year = year
+                closed = holiday_keys.get(year, 0) | ye
+            if not (closed >> ((month - 1) * 32 + day - 1)) & 1:
+                last_biz_key = key
+        biz_map[key] = last_biz_key
+
+        weekday = (weekday + 1) % 7
+        day += 1
+        if day > dim:
+            day = 1
+            month += 1
+            if month > 12:
+                month = 1
+                year += 1
+            dim = _days_in_month(year, month)
+    return biz_map
+
+
+@functools.lru_cache(maxsize=128)
+def _build_gotobi_base_days_impl(
+    year: int,
+    month: int,
+    include_day31: bool,
+    include_feb_last_day: bool,
+    exclude_yearend_bank_closure: bool,
+) -> tuple[int, ...]:
     dim = _days_in_month(year, month)
     days: list[int] = []
 
@@ -200,59 +296,83 @@ def build_gotobi_base_days(year: int, month: int, cfg: Config) -> list[int]:
         if d <= dim:
             days.append(d)
 
-    if cfg.include_day31 and dim >= 31:
+    if include_day31 and dim >= 31:
         # EA互換: 年末年始除外ONのとき12月の31日は候補にしない
-        if not (cfg.exclude_yearend_bank_closure and month == 12):
+        if not (exclude_yearend_bank_closure and month == 12):
             days.append(31)
 
-    if cfg.include_feb_last_day and month == 2:
+    if include_feb_last_day and month == 2:
         days.append(dim)
 
-    return days
+    return tuple(days)
+
+
+def build_gotobi_base_days(year: int, month: int, cfg: Config) -> tuple[int, ...]:
+    # (年, 月, 関係する cfg の bool) だけで決まる純関数なのでメモ化する
+    return _build_gotobi_base_days_impl(
+        year,
+        month,
+        cfg.include_day31,
+        cfg.include_feb_last_day,
+        cfg.exclude_yearend_bank_closure,
+    )
 
 
 def is_fixing_day(
     target: dt.date,
     *,
-    holiday_keys_jp: set[int] | None,
-    holiday_keys_us: set[int] | None,
+    biz_map: dict[int, int],
     cfg: Config,
 ) -> tuple[bool, int]:
     """
     target（日付だけ）が「実質ゴトー日(F)」か？
+    biz_map は build_biz_day_map の結果（target ～ target の月末を含むこと）
     戻り値: (True/False, base_day)
     base_day は元の日付（5/10/.., 31, 2月最終日など）
     """
-    for base_day in build_gotobi_base_days(target.year, target.month, cfg):
-        base_date = dt.date(target.year, target.month, base_day)
-        normalized = normalize_biz_day(
-            base_date,
-            holiday_keys_jp=holiday_keys_jp,
-            holiday_keys_us=holiday_keys_us,
-            cfg=cfg,
-        )
+    # EA互換: 正規化後が年末年始なら候補から除外（正規化後 == target なので target で判定）
+    if cfg.exclude_yearend_bank_closure and _is_yearend_closure_day(target):
+        return False, 0
+
+    # 候補日は全て target と同じ年月なので、キーは month_key + base_day の整数演算で作る
+    # 前倒しは過去方向のみなので、target より前のベース日付は target にならない
+    target_day = target.day
+    target_key = _date_key(target)
+    month_key = target_key - target_day
+    base_day = next(
+        (
+            b
+            for b in build_gotobi_base_days(target.year, target.month, cfg)
+            if b >= target_day and biz_map[month_key + b] == target_key
+        ),
+        0,
+    )
+    return base_day != 0, base_day
 
-        # EA互換: 正規化後が年末年始なら候補から除外
-        if cfg.exclude_yearend_bank_closure and _is_yearend_closure_day(normalized):
-            continue
 
-        if normalized == target:
-            return True, base_day
-    return False, 0
+def biz_day_map_range(today: dt.date) -> tuple[dt.date, dt.date]:
+    """
+    choose_fixing_date が参照する範囲（今日 ～ 明日の月末）
+    """
+    tomorrow = today + dt.timedelta(days=1)
+    start = today
+    end = dt.date(tomorrow.year, tomorrow.month, _days_in_month(tomorrow.year, tomorrow.month))
+    return start, end
 
 
-def choose_fixing_date(now_jst: dt.datetime, *, holiday_keys_jp: set[int] | None, holiday_keys_us: set[int] | None, cfg: Config) -> tuple[dt.date | None, int]:
+def choose_fixing_date(now_jst: dt.datetime, *, biz_map: dict[int, int], cfg: Config) -> tuple[dt.date | None, int]:
     """
     JST日付で「今日 or 明日」がFなら採用。それ以外は通知対象外。
+    biz_map は今日～明日の月末をカバーしていること（biz_day_map_range）。
     """
     today = now_jst.date()
     tomorrow = today + dt.timedelta(days=1)
 
-    ok_today, base_today = is_fixing_day(today, holiday_keys_jp=holiday_keys_jp, holiday_keys_us=holiday_keys_us, cfg=cfg)
+    ok_today, base_today = is_fixing_day(today, biz_map=biz_map, cfg=cfg)
     if ok_today:
         return today, base_today
 
-    ok_tom, base_tom = is_fixing_day(tomorrow, holiday_keys_jp=holiday_keys_jp, holiday_keys_us=holiday_keys_us, cfg=cfg)
+    ok_tom, base_tom = is_fixing_day(tomorrow, biz_map=biz_map, cfg=cfg)
     if ok_tom:
         return tomorrow, base_tom
 
@@ -269,6 +389,9 @@ def in_notify_window(now_jst: dt.datetime, fixing_date: dt.date, cfg: Config) ->
 
 
 def ntfy_publish(*, server: str, topic: str, title: str, priority: str, message: str, timeout_sec: int = 15) -> None:
+    # 起動を軽くするため、通知/入出力系のモジュールは使う関数の中で import する
+    import urllib.request
+
     server = server.rstrip("/")
     topic = topic.strip().lstrip("/")
     url = f"{server}/{topic}"
@@ -280,6 +403,7 @@ def ntfy_publish(*, server: str, topic: str, title: str, priority: str, message:
     req.add_header("Title", title)
     req.add_header("Priority", priority)
 
+    # urlopen は urllib.request 内部の opener を使い回すので、別途保持しない
     with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
         # 2xx expected; urllib raises for HTTPError otherwise
         _ = resp.read()
@@ -299,6 +423,9 @@ def local_notify(*, title: str, message: str) -> bool:
     - Windows: PowerShell NotifyIcon balloon (フォールバック的)
     見つからない/失敗した場合は False を返す。
     """
+    import shutil
+    import subprocess
+
     # Termux on Android
     if shutil.which("termux-notification"):
         try:
@@ -373,27 +500,55 @@ def local_notify(*, title: str, message: str) -> bool:
 
 
 def load_state(state_file: Path) -> dict:
-    if not state_file.exists():
+    import json
+
+    # exists() を挟まず直接読む（未作成なら FileNotFoundError）。bytes のまま json.loads に渡す
+    try:
+        data = state_file.read_bytes()
+    except OSError:
         return {}
     try:
-        with state_file.open("r", encoding="utf-8") as f:
-            obj = json.load(f)
+        obj = json.loads(data)
         return obj if isinstance(obj, dict) else {}
     except Exception:
         return {}
 
 
-def save_state(state_file: Path, obj: dict) -> None:
-    state_file.parent.mkdir(parents=True, exist_ok=True)
+def save_state(state_file: Path, obj: dict, *, pretty: bool = False) -> None:
+    import json
+
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    data = text.encode("utf-8")
+
+    if not state_file.parent.is_dir():
+        state_file.parent.mkdir(parents=True, exist_ok=True)
     tmp = state_file.with_suffix(state_file.suffix + ".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
-    tmp.replace(state_file)
+    # 小さいファイルなので、バッファ付きファイルを介さず os.write で一括書き込みしてから置き換える
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp, state_file)
+
+
+# 仲値時刻 9:55(JST) の当日0時からの秒数
+_FIXING_SEC_OF_DAY = 9 * 3600 + 55 * 60
 
 
 def build_message(now_jst: dt.datetime, fixing_date: dt.date, base_day: int) -> str:
-    fixing955 = dt.datetime(fixing_date.year, fixing_date.month, fixing_date.day, 9, 55, tzinfo=JST)
-    remaining_minutes = max(0, int((fixing955 - now_jst).total_seconds() // 60))
+    # now_jst は JST 前提。datetime を作らず整数演算で 9:55 までの残り時間を出す（秒未満は切り捨て側に寄せる）
+    sec_to_fix = (
+        (fixing_date.toordinal() - now_jst.toordinal()) * 86400
+        + _FIXING_SEC_OF_DAY
+        - (now_jst.hour * 3600 + now_jst.minute * 60 + now_jst.second)
+    )
+    remaining_minutes = max(0, (sec_to_fix * 1_000_000 - now_jst.microsecond) // 60_000_000)
     rem_hours, rem_mins = divmod(remaining_minutes, 60)
     return (
         f"【五十日仲値アラート】JST {fixing_date.year:04d}/{fixing_date.month:02d}/{fixing_date.day:02d}"
@@ -401,6 +556,25 @@ def build_message(now_jst: dt.datetime, fixing_date: dt.date, base_day: int) ->
     )
 
 
+# `--now` 用: 日付(YYYY-MM-DD / YYYYMMDD) + 区切り(T/空白/なし) + 時刻(HHMM / H:MM[:SS]) + TZ(任意)
+_NOW_RE = re.compile(
+    r"(\d{4})(-?)(\d{2})\2(\d{2})"
+    r"[T ]?"
+    r"(?:(\d{2})(\d{2})|(\d{1,2}):(\d{2})(?::(\d{2}))?)"
+    r"(Z|[+-]\d{2}(?::?\d{2})?)?"
+)
+
+
+def _parse_tz(s: str) -> dt.timezone:
+    # 'Z' / '+HH' / '+HH:MM' / '+HHMM'
+    if s == "Z":
+        return dt.timezone.utc
+    sign = -1 if s[0] == "-" else 1
+    digits = s[1:].replace(":", "")
+    offset = dt.timedelta(hours=int(digits[:2]), minutes=int(digits[2:] or 0))
+    return dt.timezone(sign * offset)
+
+
 def _parse_now_arg_to_jst(s: str) -> dt.datetime:
     """
     `--now` 用のパーサ。
@@ -411,63 +585,28 @@ def _parse_now_arg_to_jst(s: str) -> dt.datetime:
       - 2026-01-02T12:34:56+09:00
       - 20260102T1234
       - 20260109 4:30
+    上記に当てはまらない形式は datetime.fromisoformat に任せる。
     タイムゾーン未指定の場合は JST として扱う。
     """
     raw = (s or "").strip()
     if not raw:
         raise ValueError("--now is empty")
 
-    # Compact format: YYYYMMDDTHHMM / YYYYMMDDHHMM
-    t = raw.replace(" ", "T")
-
-    # Accept: YYYYMMDDTH:MM / YYYYMMDDTHH:MM (hour may be 1 digit), with optional seconds/tz
-    # Example: 20260109 4:30  -> 20260109T4:30 -> 2026-01-09T04:30
-    if len(t) >= 10 and t[:8].isdigit() and t[8] == "T" and (":" in t[9:]):
-        date8 = t[:8]
-        rest = t[9:]
-
-        # Handle 'Z' suffix (UTC)
-        tz_part = ""
-        if rest.endswith("Z"):
-            rest = rest[:-1]
-            tz_part = "+00:00"
-
-        # Split timezone part (+HH:MM / -HH:MM) if present
-        time_part = rest
-        for i in range(1, len(rest)):
-            if rest[i] in "+-" and rest[i - 1].isdigit():
-                time_part = rest[:i]
-                tz_part = rest[i:]
-                break
-
-        parts = time_part.split(":")
-        if len(parts) < 2 or len(parts) > 3:
-            raise ValueError(f"Invalid --now time part: {raw}")
-        hh_s, mm_s = parts[0], parts[1]
-        ss_s = parts[2] if len(parts) == 3 else None
-        if (not hh_s.isdigit()) or (not mm_s.isdigit()) or (ss_s is not None and (not ss_s.isdigit())):
-            raise ValueError(f"Invalid --now time digits: {raw}")
-        hh = int(hh_s)
-        mm = int(mm_s)
-        ss = int(ss_s) if ss_s is not None else None
-        if hh < 0 or hh > 23 or mm < 0 or mm > 59 or (ss is not None and (ss < 0 or ss > 59)):
-            raise ValueError(f"Invalid --now time range: {raw}")
-
-        yyyy = date8[:4]
-        mo = date8[4:6]
-        dd = date8[6:8]
-        if ss is None:
-            t = f"{yyyy}-{mo}-{dd}T{hh:02d}:{mm:02d}{tz_part}"
-        else:
-            t = f"{yyyy}-{mo}-{dd}T{hh:02d}:{mm:02d}:{ss:02d}{tz_part}"
-
-    if len(t) == 13 and t[8] == "T" and t[:8].isdigit() and t[9:].isdigit():
-        t = f"{t[:4]}-{t[4:6]}-{t[6:8]}T{t[9:11]}:{t[11:13]}"
-    elif len(t) == 12 and t[:12].isdigit():
-        t = f"{t[:4]}-{t[4:6]}-{t[6:8]}T{t[8:10]}:{t[10:12]}"
-
+    m = _NOW_RE.fullmatch(raw)
     try:
-        parsed = dt.datetime.fromisoformat(t)
+        if m:
+            year, _, month, day, hh_c, mm_c, hh, mm, ss, tz = m.groups()
+            parsed = dt.datetime(
+                int(year),
+                int(month),
+                int(day),
+                int(hh_c or hh),
+                int(mm_c or mm),
+                int(ss or 0),
+                tzinfo=_parse_tz(tz) if tz else None,
+            )
+        else:
+            parsed = dt.datetime.fromisoformat(raw)
     except Exception as e:
         raise ValueError(f"Invalid --now format: {raw}") from e
 
@@ -476,18 +615,48 @@ def _parse_now_arg_to_jst(s: str) -> dt.datetime:
     return parsed.astimezone(JST)
 
 
+def _already_notified_fixing_key(now_jst: dt.datetime, last_key: int, cfg: Config) -> int:
+    """
+    祝日CSVを読まずに「今回は通知済みで終わる」と分かる場合、そのF(YYYYMMDD)を返す（分からなければ 0）。
+    - last_key が今日: 今日はFなので choose_fixing_date は今日を選び、ウィンドウ外 or 通知済みで終わる
+    - last_key が明日: 今日の通知ウィンドウ終了後なら今日は通知対象にならず、明日は通知済み
+    """
+    today = now_jst.date()
+    if last_key == _date_key(today):
+        return last_key
+    if cfg.enforce_window and last_key == _date_key(today + dt.timedelta(days=1)):
+        if (now_jst.hour, now_jst.minute) >= cfg.window_fixing_end_hhmm:
+            return last_key
+    return 0
+
+
 def run_once(cfg: Config) -> int:
     now_jst = cfg.test_now_jst or dt.datetime.now(tz=JST)
 
+    # state を先に見て、通知済みと確定できれば祝日CSVの読み込み以降を省略する
+    state = load_state(cfg.state_file)
+    # 値が壊れている場合は load_state の破損時と同様に「通知履歴なし」とみなす
+    try:
+        last_key = int(state.get("last_notified_fixing_yyyymmdd") or 0)
+    except (TypeError, ValueError):
+        last_key = 0
+    notified_key = _already_notified_fixing_key(now_jst, last_key, cfg)
+    if notified_key:
+        print(f"[{now_jst.isoformat()}] 既に通知済み(F={notified_key}): スキップ")
+        return 0
+
     # holidays
-    holiday_keys_jp = None
-    holiday_keys_us = None
+    bitmaps: list[dict[int, int]] = []
     if cfg.enable_holiday_jp:
-        holiday_keys_jp = load_holiday_keys(cfg.holiday_csv_jp)
+        bitmaps.append(load_holiday_keys_cached(cfg.holiday_csv_jp))
     if cfg.enable_holiday_us:
-        holiday_keys_us = load_holiday_keys(cfg.holiday_csv_us)
+        bitmaps.append(load_holiday_keys_cached(cfg.holiday_csv_us))
+    holiday_keys = _merge_holiday_bitmaps(*bitmaps)
 
-    fixing_date, base_day = choose_fixing_date(now_jst, holiday_keys_jp=holiday_keys_jp, holiday_keys_us=holiday_keys_us, cfg=cfg)
+    start, end = biz_day_map_range(now_jst.date())
+    biz_map = build_biz_day_map(start, end, holiday_keys=holiday_keys, cfg=cfg)
+
+    fixing_date, base_day = choose_fixing_date(now_jst, biz_map=biz_map, cfg=cfg)
     if fixing_date is None:
         print(f"[{now_jst.isoformat()}] Fixingなし（今日/明日）: 通知なし")
         return 0
@@ -499,8 +668,6 @@ def run_once(cfg: Config) -> int:
         return 0
 
     fixing_key = _date_key(fixing_date)
-    state = load_state(cfg.state_file)
-    last_key = int(state.get("last_notified_fixing_yyyymmdd") or 0)
     if last_key == fixing_key:
         print(f"[{now_jst.isoformat()}] 既に通知済み(F={fixing_key}): スキップ")
         return 0
@@ -542,7 +709,7 @@ def run_once(cfg: Config) -> int:
         state.update(
             state_payload
         )
-        save_state(cfg.state_file, state)
+        save_state(cfg.state_file, state, pretty=cfg.pretty_state)
         print(f"[{now_jst.isoformat()}] state更新: {cfg.state_file}")
     else:
         print(f"[{now_jst.isoformat()}] skip: state更新は無効です（--no-state）")
@@ -570,6 +737,7 @@ def parse_args(argv: list[str]) -> Config:
     p.add_argument("--no-state", action="store_true", help="テスト用: state更新を行わない")
     # 互換: 旧オプション名
     p.add_argument("--no-state-update", action="store_true", help=argparse.SUPPRESS)
+    p.add_argument("--pretty-state", action="store_true", help="state jsonをインデント付きで書き出す（手で確認する用）")
     # 互換: 旧dry-run（送信もstate更新も止める）
     p.add_argument("--dry-run", action="store_true", help="(互換) --no-ntfy と --no-state を同時に指定")
 
@@ -596,6 +764,7 @@ def parse_args(argv: list[str]) -> Config:
         test_now_jst=now_jst,
         enable_ntfy=not (bool(args.no_ntfy) or bool(args.dry_run)),
         enable_state_update=not (bool(args.no_state) or bool(args.no_state_update) or bool(args.dry_run)),
+        pretty_state=bool(args.pretty_state),
     )
 
 
@@ -609,12 +778,15 @@ def main(argv: list[str]) -> int:
         except (FileNotFoundError, ValueError) as e:
             print(f"[ERROR] 入力データ不備: {e}", file=sys.stderr)
             return 2
-        except urllib.error.HTTPError as e:
-            print(f"[ERROR] ntfy HTTPError: {e.code} {e.reason}", file=sys.stderr)
-        except urllib.error.URLError as e:
-            print(f"[ERROR] ntfy URLError: {e.reason}", file=sys.stderr)
         except Exception as e:
-            print(f"[ERROR] 予期せぬエラー: {e}", file=sys.stderr)
+            import urllib.error
+
+            if isinstance(e, urllib.error.HTTPError):
+                print(f"[ERROR] ntfy HTTPError: {e.code} {e.reason}", file=sys.stderr)
+            elif isinstance(e, urllib.error.URLError):
+                print(f"[ERROR] ntfy URLError: {e.reason}", file=sys.stderr)
+            else:
+                print(f"[ERROR] 予期せぬエラー: {e}", file=sys.stderr)
 
         if attempt == 1:
             time.sleep(10)